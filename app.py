@@ -2,9 +2,16 @@ import streamlit as st
 import tempfile
 import os
 import time
-import base64
 import json
-from utils import extract_metadata, calculate_hash, analyze_frames
+
+try:
+    import orjson
+except ImportError:  # Optional dependency; fall back to the json module
+    orjson = None
+from utils import (
+    analyze, create_hasher,
+    summarize_altered_frames, expand_altered_frames, DEFAULT_HASH_ALGORITHM
+)
 from visualizations import display_metadata_chart, plot_altered_frames, create_frame_heatmap
 
 # Page configuration
@@ -14,6 +21,55 @@ st.set_page_config(
     layout="wide",
 )
 
+def remove_temp_file(path):
+    """
+    Delete a temporary upload, ignoring files that are already gone
+    
+    Args:
+        path (str): Path to the temporary file
+    """
+    try:
+        os.unlink(path)
+    except OSError:
+        pass  # We'll ignore errors in cleanup
+
+def serialize_report(report):
+    """
+    Encode a forensic report as indented JSON
+    
+    Args:
+        report (dict): Forensic report
+        
+    Returns:
+        str: JSON text of the report
+    """
+    if orjson is not None:
+        return orjson.dumps(report, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(report, indent=2)
+
+@st.cache_data(show_spinner=False)
+def analyze_video(_video_path, video_hash, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+    """
+    Run the metadata and frame analysis for a video, memoized on the file's
+    full hash so that re-uploading the same file skips the work
+    
+    Args:
+        _video_path (str): Path to the video file (not part of the cache key,
+            since every upload lands in a fresh temporary file)
+        video_hash (str): Hex digest of the whole file, as calculate_hash computes it
+        hash_algorithm (str): Algorithm that produced video_hash
+        
+    Returns:
+        dict: Metadata and altered frame summary of the video
+    """
+    # Extract metadata and analyze frames
+    metadata, altered_frames = analyze(_video_path)
+    
+    return {
+        'metadata': metadata,
+        'altered_frames': summarize_altered_frames(altered_frames),
+    }
+
 # Display VidGuard logo
 st.markdown(
     """
@@ -72,54 +128,61 @@ with tab1:
     uploaded_file = st.file_uploader("Choose a video file", type=['mp4', 'avi', 'mov', 'mkv'])
     
     if uploaded_file is not None:
-        # Save the uploaded file to a temporary location
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            video_path = tmp_file.name
-        
-        # Show a spinner while analyzing the video
-        with st.spinner("Analyzing video. This may take a while depending on the file size..."):
-            # Create a progress bar
-            progress_bar = st.progress(0)
-            
-            # Extract metadata (10% of progress)
-            progress_bar.progress(10)
-            metadata = extract_metadata(video_path)
-            time.sleep(0.5)  # Simulate processing time
-            
-            # Calculate hash (30% of progress)
-            progress_bar.progress(30)
-            video_hash = calculate_hash(video_path)
-            time.sleep(0.5)  # Simulate processing time
-            
-            # Analyze frames (90% of progress)
-            progress_bar.progress(60)
-            altered_frames = analyze_frames(video_path)
-            time.sleep(0.5)  # Simulate processing time
-            
-            # Create forensic report
-            report = {
-                'filename': uploaded_file.name,
-                'filesize': uploaded_file.size,
-                'metadata': metadata,
-                'hash': video_hash,
-                'altered_frames': altered_frames,
-                'analysis_timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
-            }
+        # Save and analyze the uploaded file once per upload; reruns
+        # triggered by other widgets reuse the stored report
+        if st.session_state.get('upload_id') != uploaded_file.file_id:
+            # Stream in large chunks rather than materializing a second copy
+            # of the whole upload with getvalue(); the bytes already pass
+            # through Python here, so hash them on the way instead of reading
+            # the file back a second time
+            uploaded_file.seek(0)
+            hasher = create_hasher(DEFAULT_HASH_ALGORITHM)
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
+                while chunk := uploaded_file.read(16 * 1024 * 1024):
+                    hasher.update(chunk)
+                    tmp_file.write(chunk)
+                video_path = tmp_file.name
+            video_hash = hasher.hexdigest()
             
-            # Store report in session state for access in other tabs
-            st.session_state.report = report
-            st.session_state.video_path = video_path
-            
-            # Complete progress
-            progress_bar.progress(100)
-            time.sleep(0.5)  # Simulate processing time
+            # Show a spinner while analyzing the video
+            with st.spinner("Analyzing video. This may take a while depending on the file size..."):
+                # Create a progress bar
+                progress_bar = st.progress(0)
+                
+                # Extract metadata and analyze frames, cached under the full
+                # hash of the upload (30% of progress)
+                progress_bar.progress(30)
+                try:
+                    analysis = analyze_video(video_path, video_hash)
+                finally:
+                    # Nothing reads the file after the analysis
+                    remove_temp_file(video_path)
+                
+                # Create forensic report
+                report = {
+                    'filename': uploaded_file.name,
+                    'filesize': uploaded_file.size,
+                    'metadata': analysis['metadata'],
+                    'hash': video_hash,
+                    'hash_algorithm': DEFAULT_HASH_ALGORITHM,
+                    'altered_frames': analysis['altered_frames'],
+                    'analysis_timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+                }
+                
+                # Store report in session state for access in other tabs,
+                # along with its JSON encoding so it is serialized only once
+                st.session_state.report = report
+                st.session_state.report_json = serialize_report(report)
+                # Expanded once per upload; the charts reuse the same array on
+                # every rerun
+                st.session_state.altered_frames = expand_altered_frames(report['altered_frames'])
+                st.session_state.upload_id = uploaded_file.file_id
+                
+                # Complete progress
+                progress_bar.progress(100)
             
         st.success("Video analysis complete! Go to the 'Analysis Results' tab to see the findings.")
         
-        # Clean up the temporary file - we'll do this when the session ends
-        # Don't delete now as we need it for the other tabs
-        
 with tab2:
     if 'report' in st.session_state:
         report = st.session_state.report
@@ -136,7 +199,7 @@ with tab2:
             st.markdown(f"**Analysis Date:** {report['analysis_timestamp']}")
         
         with basic_info_col2:
-            st.markdown(f"**MD5 Hash:** `{report['hash']}`")
+            st.markdown(f"**{report['hash_algorithm'].upper()} Hash:** `{report['hash']}`")
             st.markdown(f"**Duration:** {report['metadata']['frame_count']/report['metadata']['fps']:.2f} seconds")
 
         # Metadata visualization
@@ -146,19 +209,23 @@ with tab2:
         # Altered frames visualization
         st.markdown("### Frame Analysis")
         
-        if len(report['altered_frames']) > 0:
-            st.warning(f"**Potential tampering detected!** Found {len(report['altered_frames'])} frames with significant changes.")
-            plot_altered_frames(report['altered_frames'], report['metadata']['frame_count'])
-            create_frame_heatmap(report['altered_frames'], report['metadata']['frame_count'])
+        altered_count = report['altered_frames']['count']
+        
+        if altered_count > 0:
+            st.warning(f"**Potential tampering detected!** Found {altered_count} frames with significant changes.")
+            # int64 array expanded at upload time, shared as-is by both charts
+            altered_frames = st.session_state.altered_frames
+            plot_altered_frames(altered_frames, report['metadata']['frame_count'])
+            create_frame_heatmap(altered_frames, report['metadata']['frame_count'])
         else:
             st.success("**No signs of tampering detected.** Frame analysis shows consistent frame transitions.")
             
         # Display the first 100 altered frames for reference
-        if len(report['altered_frames']) > 0:
+        if altered_count > 0:
             with st.expander("View detailed altered frames information"):
-                max_frames = min(100, len(report['altered_frames']))
-                st.write(f"First {max_frames} altered frame positions (out of {len(report['altered_frames'])} total):")
-                st.write(report['altered_frames'][:max_frames])
+                first_frames = report['altered_frames']['first_100']
+                st.write(f"First {len(first_frames)} altered frame positions (out of {altered_count} total):")
+                st.write(first_frames)
                 
     else:
         st.info("Please upload a video in the 'Home & Upload' tab to see analysis results.")
@@ -169,8 +236,8 @@ with tab3:
         
         st.markdown("## Forensic Report")
         
-        # Create JSON string from report
-        report_json = json.dumps(report, indent=4)
+        # JSON string created once when the report was generated
+        report_json = st.session_state.report_json
         
         # Display JSON in a code block
         st.markdown("### Report Data (JSON)")
@@ -179,20 +246,19 @@ with tab3:
         # Provide download button for the report
         st.markdown("### Download Report")
         
-        # Function to create a download link for the report
-        def get_report_download_link(report_json, filename="vidguard_forensic_report.json"):
-            b64 = base64.b64encode(report_json.encode()).decode()
-            href = f'<a href="data:file/json;base64,{b64}" download="{filename}">Download Report (JSON)</a>'
-            return href
-        
-        st.markdown(get_report_download_link(report_json), unsafe_allow_html=True)
+        st.download_button(
+            "Download Report (JSON)",
+            data=report_json.encode(),
+            file_name="vidguard_forensic_report.json",
+            mime="application/json"
+        )
         
         # Forensic summary
         st.markdown("### Forensic Analysis Summary")
         
         # Overall integrity assessment
-        if len(report['altered_frames']) > 0:
-            integrity_score = max(0, 100 - (len(report['altered_frames']) / report['metadata']['frame_count'] * 100))
+        if report['altered_frames']['count'] > 0:
+            integrity_score = max(0, 100 - (report['altered_frames']['count'] / report['metadata']['frame_count'] * 100))
             st.warning(f"**Video Integrity Score: {integrity_score:.1f}%**")
             st.markdown("This video shows signs of potential tampering. The altered frames suggest possible manipulation.")
         else:
@@ -201,7 +267,7 @@ with tab3:
         
         # Recommendations
         st.markdown("### Recommendations")
-        if len(report['altered_frames']) > 0:
+        if report['altered_frames']['count'] > 0:
             st.markdown("""
             - Conduct further analysis on the identified altered frames
             - Consider advanced forensic techniques for deeper examination
@@ -477,10 +543,3 @@ with tab4:
 st.markdown("---")
 st.markdown("*VidGuard - Advanced Video Forensics Tool. For investigative and educational purposes only.*")
 st.markdown("*Created by Om Golesar*")
-
-# Clean up temporary files when the session ends
-if 'video_path' in st.session_state:
-    try:
-        os.unlink(st.session_state.video_path)
-    except:
-        pass  # We'll ignore errors in cleanup
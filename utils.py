@@ -1,36 +1,88 @@
+import collections
 import cv2
 import hashlib
+import itertools
+import mmap
 import numpy as np
 import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-def extract_metadata(video_path):
+try:
+    from blake3 import blake3
+except ImportError:  # Optional dependency; fall back to hashlib
+    blake3 = None
+
+try:
+    import av
+except ImportError:  # Optional dependency; fall back to cv2.VideoCapture
+    av = None
+
+try:
+    from av.codec.hwaccel import HWAccel, hwdevices_available
+except ImportError:  # Hardware decoding needs PyAV 14 or newer
+    HWAccel = None
+
+# BLAKE3 is multi-threaded and SIMD-accelerated; SHA-256 uses SHA-NI via OpenSSL
+DEFAULT_HASH_ALGORITHM = 'blake3' if blake3 is not None else 'sha256'
+
+# Number of consecutive frames diffed together by each worker
+_CHUNK_SIZE = 64
+
+# Bytes of the memory-mapped file fed to the hasher per update
+_HASH_CHUNK_SIZE = 64 << 20
+
+# Perceptual hashes are computed from frames shrunk to this square size
+_PHASH_SIZE = 32
+
+# Hash bits (of 64) that must differ between consecutive frames to flag one.
+# Ordinary motion flips at most 16 bits, while spliced or noise frames flip
+# 28 or more, so the default sits between the two
+_PHASH_HAMMING_THRESHOLD = 20
+
+def _dct_matrix(size):
     """
-    Extract video metadata including frame count, width, height, FPS, and codec
+    Build the orthonormal DCT-II basis matrix, matching cv2.dct
     
     Args:
-        video_path (str): Path to the video file
+        size (int): Number of samples
+        
+    Returns:
+        numpy.ndarray: (size, size) float32 matrix whose rows are basis vectors
+    """
+    n = np.arange(size)
+    basis = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * size)) * np.sqrt(2 / size)
+    basis[0] /= np.sqrt(2)
+    return basis.astype(np.float32)
+
+# First eight DCT basis vectors, used to project frames onto the 8x8
+# low-frequency block that the perceptual hash is built from
+_PHASH_DCT = _dct_matrix(_PHASH_SIZE)[:8]
+
+def _build_metadata(frame_count, frame_width, frame_height, fps, codec):
+    """
+    Assemble the metadata dictionary shared by the OpenCV and PyAV readers
+    
+    Args:
+        frame_count (int): Number of frames in the video
+        frame_width (int): Frame width in pixels
+        frame_height (int): Frame height in pixels
+        fps (float): Frames per second
+        codec (str): Four-character codec code or codec name
         
     Returns:
         dict: Dictionary containing video metadata
     """
     metadata = {}
-    cap = cv2.VideoCapture(video_path)
-    
-    if not cap.isOpened():
-        return {"error": "Failed to open video file"}
     
     # Extract basic metadata
-    metadata['frame_count'] = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    metadata['frame_width'] = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    metadata['frame_height'] = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    metadata['fps'] = cap.get(cv2.CAP_PROP_FPS)
+    metadata['frame_count'] = frame_count
+    metadata['frame_width'] = frame_width
+    metadata['frame_height'] = frame_height
+    metadata['fps'] = fps
     metadata['resolution'] = f"{metadata['frame_width']}x{metadata['frame_height']}"
-    
-    # Get codec information
-    fourcc_int = int(cap.get(cv2.CAP_PROP_FOURCC))
-    # Convert fourcc to human-readable format
-    fourcc_chars = chr(fourcc_int & 0xFF) + chr((fourcc_int >> 8) & 0xFF) + chr((fourcc_int >> 16) & 0xFF) + chr((fourcc_int >> 24) & 0xFF)
-    metadata['codec'] = fourcc_chars
+    metadata['codec'] = codec
     
     # Calculate duration
     if metadata['fps'] > 0:
@@ -38,66 +90,647 @@ def extract_metadata(video_path):
     else:
         metadata['duration_seconds'] = 0
     
-    cap.release()
     return metadata
 
-def calculate_hash(video_path):
+def _read_metadata(cap):
+    """
+    Read metadata from an already opened video capture
+    
+    Args:
+        cap (cv2.VideoCapture): Opened video capture
+        
+    Returns:
+        dict: Dictionary containing video metadata
+    """
+    # Get codec information
+    fourcc_int = int(cap.get(cv2.CAP_PROP_FOURCC))
+    # Convert fourcc to human-readable format; the mask handles negative values
+    codec = (fourcc_int & 0xFFFFFFFF).to_bytes(4, 'little').decode('ascii', 'replace')
+    
+    return _build_metadata(
+        int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        cap.get(cv2.CAP_PROP_FPS),
+        codec,
+    )
+
+def _read_metadata_av(container):
+    """
+    Read metadata from an already opened PyAV container
+    
+    Args:
+        container (av.container.InputContainer): Opened video container
+        
+    Returns:
+        dict: Dictionary containing video metadata
+    """
+    stream = container.streams.video[0]
+    fps = float(stream.average_rate or stream.guessed_rate or 0)
+    
+    # Not every container stores a frame count; estimate it from the
+    # duration like OpenCV does
+    frame_count = stream.frames
+    if frame_count <= 0 and container.duration:
+        frame_count = int(round(container.duration / av.time_base * fps))
+    
+    return _build_metadata(
+        frame_count,
+        stream.width,
+        stream.height,
+        fps,
+        stream.codec_tag.strip('\x00') or stream.codec_context.name,
+    )
+
+def extract_metadata(video_path):
+    """
+    Extract video metadata including frame count, width, height, FPS, and codec
+    
+    Args:
+        video_path (str): Path to the video file
+        
+    Returns:
+        dict: Dictionary containing video metadata
+    """
+    cap = cv2.VideoCapture(video_path)
+    
+    try:
+        if not cap.isOpened():
+            return {"error": "Failed to open video file"}
+        return _read_metadata(cap)
+    finally:
+        cap.release()
+
+def create_hasher(algorithm=DEFAULT_HASH_ALGORITHM):
+    """
+    Create an incremental hasher for data that is only available in chunks
+    
+    Args:
+        algorithm (str): 'blake3', or any hashlib algorithm such as 'sha256' or 'md5'
+        
+    Returns:
+        object: Hasher with update() and hexdigest() methods
+    """
+    if algorithm == 'blake3':
+        if blake3 is None:
+            raise ValueError("BLAKE3 hashing requires the 'blake3' package")
+        return blake3(max_threads=blake3.AUTO)
+    return hashlib.new(algorithm)
+
+def calculate_hash(video_path, algorithm=DEFAULT_HASH_ALGORITHM):
     """
-    Calculate MD5 hash of the video file
+    Calculate a cryptographic hash of the video file
     
     Args:
         video_path (str): Path to the video file
+        algorithm (str): 'blake3', or any hashlib algorithm such as 'sha256' or 'md5'
         
     Returns:
-        str: MD5 hash of the video file
+        str: Hex digest of the video file
     """
-    hash_md5 = hashlib.md5()
+    hasher = create_hasher(algorithm)
+    
+    if algorithm == 'blake3':
+        hasher.update_mmap(video_path)
+        return hasher.hexdigest()
+    
     with open(video_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096), b''):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+        if os.fstat(f.fileno()).st_size == 0:
+            return hasher.hexdigest()
+        
+        # Hash the page-cache pages in place rather than copying them into
+        # Python buffers; slicing keeps each update within the address space
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                for offset in range(0, len(view), _HASH_CHUNK_SIZE):
+                    hasher.update(view[offset:offset + _HASH_CHUNK_SIZE])
+            finally:
+                view.release()
+    return hasher.hexdigest()
 
-def analyze_frames(video_path, threshold=0.05):
+def _open_av_container(video_path):
     """
-    Analyze frames for alterations or tampering
+    Open a video with PyAV, preferring a hardware-accelerated decoder
     
     Args:
         video_path (str): Path to the video file
-        threshold (float): Threshold for frame difference detection
         
     Returns:
-        list: List of potentially altered frame indices
+        av.container.InputContainer: Opened container with at least one video
+            stream, or None if PyAV cannot open the file
     """
-    cap = cv2.VideoCapture(video_path)
-    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    # Hardware device types are tried in the order FFmpeg reports them;
+    # opening fails outright on hosts without the matching device
+    for device_type in hwdevices_available() if HWAccel is not None else []:
+        try:
+            container = av.open(
+                video_path,
+                hwaccel=HWAccel(device_type=device_type, allow_software_fallback=True)
+            )
+        except av.FFmpegError:
+            continue
+        if container.streams.video:
+            return container
+        container.close()
+        return None
     
-    if frame_count <= 0:
-        return []
+    try:
+        container = av.open(video_path)
+    except av.FFmpegError:
+        return None
+    if container.streams.video:
+        return container
+    container.close()
+    return None
+
+def _read_frames_av(container, sample_stride):
+    """
+    Yield grayscale frames decoded by PyAV
     
-    altered_frames = []
-    prev_frame = None
+    Args:
+        container (av.container.InputContainer): Opened video container
+        sample_stride (int): Only every Nth frame is converted and yielded
+        
+    Yields:
+        numpy.ndarray: Grayscale frame, reused between iterations
+    """
+    stream = container.streams.video[0]
+    stream.thread_type = 'AUTO'
+    gray_frame = None
+    decoded = enumerate(container.decode(stream))
+    
+    while True:
+        try:
+            i, frame = next(decoded)
+        except StopIteration:
+            break
+        except av.FFmpegError:
+            # Damaged or truncated data ends the stream, the same way
+            # cap.read() returning False does for OpenCV
+            break
+        
+        if i % sample_stride:
+            continue
+        
+        # Go through BGR exactly like OpenCV's FFmpeg backend does; taking the
+        # luma plane directly gives slightly different pixels, which changes
+        # which frames are flagged depending on the decoder
+        bgr_frame = frame.to_ndarray(format='bgr24')
+        
+        if gray_frame is None:
+            gray_frame = np.empty(bgr_frame.shape[:2], np.uint8)
+        
+        # Convert to grayscale for easier comparison
+        cv2.cvtColor(bgr_frame, cv2.COLOR_BGR2GRAY, dst=gray_frame)
+        yield gray_frame
+
+def _read_frames_cv2(cap, frame_count, sample_stride):
+    """
+    Yield grayscale frames decoded by an OpenCV capture
+    
+    Args:
+        cap (cv2.VideoCapture): Opened video capture
+        frame_count (int): Maximum number of frames to read
+        sample_stride (int): Only every Nth frame is retrieved and yielded
+        
+    Yields:
+        numpy.ndarray: Grayscale frame, reused between iterations
+    """
+    gray_frame = None
     
     for i in range(frame_count):
-        ret, frame = cap.read()
+        # grab() only demuxes; skipped frames are never converted to BGR
+        if not cap.grab():
+            break
+        
+        if i % sample_stride:
+            continue
+        
+        ret, frame = cap.retrieve()
         
         if not ret:
             break
-            
+        
+        if gray_frame is None:
+            gray_frame = np.empty(frame.shape[:2], np.uint8)
+        
         # Convert to grayscale for easier comparison
-        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray_frame)
+        yield gray_frame
+
+def _decode_frames(frames, downscale, batch_queue, errors, frame_size=None):
+    """
+    Push batches of downscaled grayscale frames onto a queue
+    
+    Each batch is a (K+1, H, W) uint8 array whose first row repeats the last
+    frame of the previous batch, so consecutive pairs can be diffed without
+    reaching across batches.
+    
+    Args:
+        frames (iterator): Grayscale frames from _read_frames_av or _read_frames_cv2
+        downscale (int): Factor by which frames are shrunk before diffing
+        batch_queue (queue.Queue): Bounded queue receiving the batches; a
+            trailing None marks the end of the stream
+        errors (list): Receives the exception that stopped decoding, if any,
+            for the consuming thread to re-raise
+        frame_size (tuple): Fixed (width, height) to resize to, overriding downscale
+    """
+    batch = None
+    filled = 0
+    
+    try:
+        for gray_frame in frames:
+            if batch is None:
+                height, width = gray_frame.shape[:2]
+                small_size = frame_size or (max(1, width // downscale), max(1, height // downscale))
+                batch = np.empty((_CHUNK_SIZE + 1, small_size[1], small_size[0]), np.uint8)
+            
+            # Only a coarse change signal is needed, so diff a downscaled copy
+            cv2.resize(gray_frame, small_size, dst=batch[filled], interpolation=cv2.INTER_AREA)
+            filled += 1
+            
+            if filled == len(batch):
+                batch_queue.put(batch)
+                next_batch = np.empty_like(batch)
+                next_batch[0] = batch[-1]
+                batch = next_batch
+                filled = 1
         
-        if prev_frame is not None:
-            # Calculate difference between current and previous frame
-            diff = cv2.absdiff(gray_frame, prev_frame)
+        if filled > 1:
+            batch_queue.put(batch[:filled])
+    except Exception as exc:
+        errors.append(exc)
+    finally:
+        batch_queue.put(None)
+
+def _diff_batch(batch, threshold):
+    """
+    Compare every frame in a batch against its predecessor in one shot
+    
+    Args:
+        batch (numpy.ndarray): (K+1, H, W) stack of consecutive frames
+        threshold (float): Threshold for frame difference detection
+        
+    Returns:
+        numpy.ndarray: Bool mask over batch[1:] of frames exceeding the threshold
+    """
+    frames = batch[1:]
+    prev_frames = batch[:-1]
+    
+    # Absolute difference in uint8 without widening to a signed type
+    diff = np.maximum(frames, prev_frames)
+    diff -= np.minimum(frames, prev_frames)
+    
+    # Count changed pixels per frame; comparing the integer count against a
+    # precomputed pixel budget avoids a per-frame division
+    changed = np.count_nonzero(diff > 25, axis=(1, 2))
+    thresh_pixels = int(threshold * diff.shape[1] * diff.shape[2])
+    
+    # Detect sudden changes that could indicate tampering
+    return changed > thresh_pixels
+
+def _phash_batch(batch, hamming_threshold):
+    """
+    Compare perceptual hashes of every frame in a batch against its predecessor
+    
+    Each 32x32 frame is reduced to a 64-bit DCT hash: the 8x8 lowest-frequency
+    coefficients thresholded at their median. Frames whose hash differs from
+    the previous one in more than `hamming_threshold` of the 64 bits are flagged.
+    
+    Args:
+        batch (numpy.ndarray): (K+1, 32, 32) stack of consecutive frames
+        hamming_threshold (int): Number of differing hash bits that flags a frame
+        
+    Returns:
+        numpy.ndarray: Bool mask over batch[1:] of frames exceeding the threshold
+    """
+    # Only the 8x8 low-frequency block is needed, so project onto the first
+    # eight DCT basis vectors instead of running a full 32x32 DCT per frame
+    low_freq = _PHASH_DCT @ batch.astype(np.float32) @ _PHASH_DCT.T
+    low_freq = low_freq.reshape(len(batch), -1)
+    
+    bits = low_freq > np.median(low_freq, axis=1, keepdims=True)
+    hashes = np.packbits(bits, axis=1).view(np.uint64).ravel()
+    
+    # Hamming distance between consecutive hashes via popcount
+    distances = np.bitwise_count(hashes[1:] ^ hashes[:-1])
+    
+    # Detect sudden changes that could indicate tampering
+    return distances > hamming_threshold
+
+def _cuda_available():
+    """
+    Check whether OpenCV was built with CUDA and can see a device
+    
+    Returns:
+        bool: True if cv2.cuda operations can run on a GPU
+    """
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):
+        return False
+
+def _read_frames_cuda(video_path, sample_stride, stream):
+    """
+    Yield frames resident in GPU memory, decoding on the device when possible
+    
+    Uses cv2.cudacodec when OpenCV provides it, otherwise decodes with
+    cv2.VideoCapture and uploads each sampled frame once.
+    
+    Args:
+        video_path (str): Path to the video file
+        sample_stride (int): Only every Nth frame is yielded
+        stream (cv2.cuda.Stream): Stream the uploads are queued on
+        
+    Yields:
+        tuple: (cv2.cuda.GpuMat, colour conversion code to grayscale)
+    """
+    try:
+        reader = cv2.cudacodec.createVideoReader(video_path)
+    except (AttributeError, cv2.error):
+        reader = None
+    
+    if reader is not None:
+        i = 0
+        while True:
+            ret, gpu_frame = reader.nextFrame(stream=stream)
             
-            # Calculate percentage of changed pixels
-            change_percentage = np.count_nonzero(diff > 25) / diff.size
+            if not ret:
+                break
             
-            # Detect sudden changes that could indicate tampering
-            if change_percentage > threshold:
-                altered_frames.append(i)
+            if i % sample_stride == 0:
+                yield gpu_frame, cv2.COLOR_BGRA2GRAY
+            i += 1
+        return
+    
+    cap = cv2.VideoCapture(video_path)
+    # Uploads alternate between two buffers so the next frame can be copied
+    # while the previous one is still being processed
+    uploads = [cv2.cuda_GpuMat(), cv2.cuda_GpuMat()]
+    
+    try:
+        i = 0
+        while cap.grab():
+            if i % sample_stride == 0:
+                ret, frame = cap.retrieve()
+                
+                if not ret:
+                    break
+                
+                gpu_frame = uploads[(i // sample_stride) % 2]
+                gpu_frame.upload(frame, stream)
+                yield gpu_frame, cv2.COLOR_BGR2GRAY
+            i += 1
+    finally:
+        cap.release()
+
+def _analyze_frames_cuda(video_path, threshold, downscale, sample_stride):
+    """
+    Run the pixel-difference analysis entirely on the GPU
+    
+    Args:
+        video_path (str): Path to the video file
+        threshold (float): Threshold for frame difference detection
+        downscale (int): Factor by which frames are shrunk before diffing
+        sample_stride (int): Analyze only every Nth frame
         
-        prev_frame = gray_frame
+    Returns:
+        list: List of potentially altered frame indices
+    """
+    stream = cv2.cuda_Stream()
+    gpu_gray = cv2.cuda_GpuMat()
+    gpu_small = [cv2.cuda_GpuMat(), cv2.cuda_GpuMat()]
+    gpu_diff = cv2.cuda_GpuMat()
+    gpu_thr = cv2.cuda_GpuMat()
+    
+    # One flag per analyzed frame; the first frame has nothing to compare with
+    altered_mask = [False]
+    small_size = None
+    # Whether a thresholded diff is still being computed on the device
+    pending = False
+    
+    frames = _read_frames_cuda(video_path, sample_stride, stream)
+    for k, item in enumerate(itertools.chain(frames, [None])):
+        # The GPU diffed the previous frame while this one was being decoded
+        if pending:
+            stream.waitForCompletion()
+            
+            # Compare the changed-pixel count against the precomputed budget
+            # to detect sudden changes that could indicate tampering
+            altered_mask.append(cv2.cuda.countNonZero(gpu_thr) > thresh_pixels)
+            pending = False
+        
+        if item is None:
+            break
         
-    cap.release()
-    return altered_frames
+        gpu_frame, conversion = item
+        if small_size is None:
+            width, height = gpu_frame.size()
+            small_size = (max(1, width // downscale), max(1, height // downscale))
+            thresh_pixels = int(threshold * small_size[0] * small_size[1])
+        
+        current = gpu_small[k % 2]
+        previous = gpu_small[(k - 1) % 2]
+        
+        cv2.cuda.cvtColor(gpu_frame, conversion, gpu_gray, stream=stream)
+        cv2.cuda.resize(gpu_gray, small_size, current, interpolation=cv2.INTER_AREA, stream=stream)
+        
+        if k > 0:
+            cv2.cuda.absdiff(current, previous, gpu_diff, stream=stream)
+            cv2.cuda.threshold(gpu_diff, 25, 1, cv2.THRESH_BINARY, gpu_thr, stream=stream)
+            pending = True
+    
+    return (np.flatnonzero(altered_mask) * sample_stride).tolist()
+
+def analyze_frames(video_path, threshold=0.05, downscale=4, sample_stride=1, method='pixel',
+                   hamming_threshold=_PHASH_HAMMING_THRESHOLD, container=None, cap=None):
+    """
+    Analyze frames for alterations or tampering
+    
+    Decoding runs on a dedicated thread while batches of consecutive frames
+    are diffed on a worker pool. The 'pixel' method runs entirely on the GPU
+    when OpenCV has CUDA support and a device is present.
+    
+    Args:
+        video_path (str): Path to the video file
+        threshold (float): Fraction of changed pixels that flags a frame in
+            the 'pixel' method
+        downscale (int): Factor by which frames are shrunk for the 'pixel' method
+        sample_stride (int): Analyze only every Nth frame; 1 analyzes all
+            frames, larger values trade detail for speed
+        method (str): 'pixel' compares downscaled frames pixel by pixel;
+            'phash' compares 64-bit perceptual hashes
+        hamming_threshold (int): Number of differing hash bits that flags a
+            frame in the 'phash' method
+        container (av.container.InputContainer): Already opened PyAV container
+            of the video, positioned at the first frame, to decode from; left open
+        cap (cv2.VideoCapture): Already opened capture of the video, positioned
+            at the first frame, to reuse when PyAV is not used; left open
+        
+    Returns:
+        list: List of potentially altered frame indices
+    """
+    if method == 'phash':
+        diff_batch = _phash_batch
+        batch_threshold = hamming_threshold
+        frame_size = (_PHASH_SIZE, _PHASH_SIZE)
+    elif method == 'pixel':
+        diff_batch = _diff_batch
+        batch_threshold = threshold
+        frame_size = None
+    else:
+        raise ValueError(f"Unknown frame analysis method: {method}")
+    
+    if method == 'pixel' and _cuda_available():
+        try:
+            return _analyze_frames_cuda(video_path, threshold, downscale, sample_stride)
+        except cv2.error:
+            pass  # Fall back to the CPU pipeline
+    
+    # Prefer PyAV, which can decode on the GPU; fall back to OpenCV
+    owns_container = container is None and cap is None
+    if owns_container and av is not None:
+        container = _open_av_container(video_path)
+    
+    if container is not None:
+        frames = _read_frames_av(container, sample_stride)
+        release = container.close if owns_container else lambda: None
+    else:
+        owns_cap = cap is None
+        if owns_cap:
+            cap = cv2.VideoCapture(video_path)
+        release = cap.release if owns_cap else lambda: None
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        
+        if frame_count <= 0:
+            release()
+            return []
+        
+        frames = _read_frames_cv2(cap, frame_count, sample_stride)
+    
+    workers = os.cpu_count() or 1
+    batch_queue = queue.Queue(maxsize=2 * workers)
+    decoder_errors = []
+    decoder = threading.Thread(
+        target=_decode_frames,
+        args=(frames, downscale, batch_queue, decoder_errors, frame_size),
+        daemon=True
+    )
+    decoder.start()
+    
+    # Each pending batch holds a (K+1, H, W) array until a worker diffs it,
+    # so cap how many are in flight rather than letting the executor's
+    # unbounded work queue absorb everything the decoder produces
+    max_in_flight = 2 * workers
+    in_flight = collections.deque()
+    changed_masks = []
+    batch = batch_queue.get()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while batch is not None:
+                if len(in_flight) >= max_in_flight:
+                    changed_masks.append(in_flight.popleft().result())
+                in_flight.append(executor.submit(diff_batch, batch, batch_threshold))
+                batch = batch_queue.get()
+            
+            changed_masks.extend(future.result() for future in in_flight)
+    finally:
+        # Keep consuming so the decoder is never left blocked on a full queue
+        while batch is not None:
+            batch = batch_queue.get()
+        decoder.join()
+        release()
+    
+    # A decoding error would otherwise leave the mask silently truncated
+    if decoder_errors:
+        raise decoder_errors[0]
+    
+    # One flag per analyzed frame; the first frame has nothing to compare with
+    altered_mask = np.concatenate([np.zeros(1, dtype=np.bool_), *changed_masks])
+    
+    return (np.flatnonzero(altered_mask) * sample_stride).tolist()
+
+def analyze(video_path, **kwargs):
+    """
+    Extract metadata and analyze frames from a single opened container
+    
+    The video is opened with PyAV when it is available and with a
+    cv2.VideoCapture otherwise, so the container is parsed only once.
+    
+    Args:
+        video_path (str): Path to the video file
+        **kwargs: Options forwarded to analyze_frames
+        
+    Returns:
+        tuple: (metadata dict, list of potentially altered frame indices)
+    """
+    container = _open_av_container(video_path) if av is not None else None
+    
+    if container is not None:
+        try:
+            metadata = _read_metadata_av(container)
+            altered_frames = analyze_frames(video_path, container=container, **kwargs)
+        finally:
+            container.close()
+        return metadata, altered_frames
+    
+    cap = cv2.VideoCapture(video_path)
+    
+    try:
+        if not cap.isOpened():
+            return {"error": "Failed to open video file"}, []
+        metadata = _read_metadata(cap)
+        altered_frames = analyze_frames(video_path, cap=cap, **kwargs)
+    finally:
+        cap.release()
+    
+    return metadata, altered_frames
+
+def summarize_altered_frames(altered_frames, sample_stride=1, preview_size=100):
+    """
+    Compact a list of altered frame indices for storage in the report
+    
+    Consecutive analyzed frames are run-length encoded, so the summary grows
+    with the number of altered segments rather than the number of frames.
+    
+    Args:
+        altered_frames (list): Sorted altered frame indices
+        sample_stride (int): Frame index step used by analyze_frames
+        preview_size (int): Number of leading indices kept verbatim
+        
+    Returns:
+        dict: Altered frame count, first indices, sample stride and a list of
+            [start, length] runs
+    """
+    frames = np.asarray(altered_frames, dtype=np.int64)
+    
+    # A run breaks wherever the gap to the previous index is not one stride
+    breaks = np.flatnonzero(np.diff(frames) != sample_stride) + 1
+    bounds = np.concatenate(([0], breaks, [len(frames)])) if len(frames) else np.zeros(1, np.int64)
+    starts = frames[bounds[:-1]]
+    lengths = np.diff(bounds)
+    
+    return {
+        'count': len(frames),
+        'first_100': frames[:preview_size].tolist(),
+        'sample_stride': sample_stride,
+        'runs': np.column_stack((starts, lengths)).tolist(),
+    }
+
+def expand_altered_frames(summary):
+    """
+    Rebuild the altered frame indices from summarize_altered_frames output
+    
+    Args:
+        summary (dict): Altered frame summary
+        
+    Returns:
+        numpy.ndarray: Sorted altered frame indices
+    """
+    runs = np.asarray(summary['runs'], dtype=np.int64).reshape(-1, 2)
+    starts, lengths = runs[:, 0], runs[:, 1]
+    
+    # Position of every frame within its run, laid out back to back
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + offsets * summary['sample_stride']
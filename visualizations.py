@@ -1,9 +1,112 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import numpy as np
 
+try:
+    import orjson  # noqa: F401
+except ImportError:  # Optional dependency; Plotly falls back to the json module
+    orjson = None
+
+# Streamlit serializes every figure through plotly.io on each rerun
+if orjson is not None:
+    pio.json.config.default_engine = "orjson"
+
+# Figure styling shared by every render, built once at import
+_PASTEL = tuple(px.colors.qualitative.Pastel)
+
+_METADATA_LAYOUT = {
+    'title': {'text': 'Video Metadata'},
+    'xaxis': {'title': {'text': None}},
+    'yaxis': {'title': {'text': 'Value'}},
+    'showlegend': False,
+    'height': 400,
+}
+
+_LINE_LAYOUT = {
+    'title': {'text': 'Distribution of Altered Frames'},
+    'xaxis': {'title': {'text': 'Frame Position'}},
+    'yaxis': {'title': {'text': 'Number of Altered Frames'}},
+    'height': 400,
+}
+
+# Heatmaps with at most this many non-zero segments are drawn without labels
+_HEATMAP_MIN_LABELED_SEGMENTS = 5
+
+_HEATMAP_LAYOUT = {
+    'title': {'text': 'Video Timeline Alteration Heatmap'},
+    'xaxis': {'title': {'text': 'Video Timeline (0% to 100%)'}},
+    'yaxis': {'showticklabels': False},
+    'height': 200,
+    'margin': dict(l=10, r=10, t=30, b=30),
+}
+
+def _as_frame_array(altered_frames):
+    """
+    Convert altered frame indices to an int64 ndarray, without copying when
+    the caller already passes one
+    
+    Args:
+        altered_frames (array-like): Altered frame indices
+        
+    Returns:
+        numpy.ndarray: int64 array of altered frame indices
+    """
+    if isinstance(altered_frames, np.ndarray) and altered_frames.dtype == np.int64:
+        return altered_frames
+    return np.asarray(altered_frames, dtype=np.int64)
+
+def _bin_altered(frames, total_frames, bins):
+    """
+    Count altered frames in equal slices of the video timeline
+    
+    Frame indices are integers in [0, total_frames), so each frame's bin is
+    found by scaling before dividing and counted with a single bincount pass,
+    instead of np.histogram's sort/search. Scaling first keeps the bins evenly
+    sized when total_frames is not a multiple of bins.
+    
+    Args:
+        frames (numpy.ndarray): int64 array of altered frame indices
+        total_frames (int): Total number of frames in the video
+        bins (int): Number of bins to divide the timeline into
+        
+    Returns:
+        tuple: (hist, edges) where hist holds the count per bin and edges the
+            bins + 1 frame boundaries, as in np.histogram
+    """
+    total_frames = max(1, total_frames)
+    bin_idx = np.minimum(bins - 1, (frames * bins) // total_frames)
+    hist = np.bincount(bin_idx, minlength=bins)
+    # First frame of each bin, i.e. ceil(i * total_frames / bins)
+    edges = -(-(np.arange(bins + 1) * total_frames) // bins)
+    return hist, edges
+
+def _build_metadata_figure(viz_metrics):
+    """
+    Build the metadata bar chart
+    
+    Args:
+        viz_metrics (dict): Metric names mapped to values small enough to plot
+        
+    Returns:
+        go.Figure: Bar chart of the metrics
+    """
+    # Create bar chart; the figure is fixed-shape, so it is built from plain
+    # dicts and Plotly's per-property validation is skipped
+    fig = go.Figure({
+        'data': [{
+            'type': 'bar',
+            'x': list(viz_metrics),
+            'y': list(viz_metrics.values()),
+            'text': list(viz_metrics.values()),
+            'marker': {'color': [_PASTEL[i % len(_PASTEL)] for i in range(len(viz_metrics))]},
+        }],
+        'layout': _METADATA_LAYOUT,
+    }, _validate=False)
+    
+    return fig
+
 def display_metadata_chart(metadata):
     """
     Create a bar chart to visualize video metadata
@@ -19,150 +122,166 @@ def display_metadata_chart(metadata):
         'FPS': round(metadata['fps'], 1),
     }
 
-    # Filter out very large numbers that might skew the visualization
-    viz_metrics = {k: v for k, v in metrics.items() if v < 10000}
-    
-    # Create a dataframe for plotting
-    df = pd.DataFrame({
-        'Metric': list(viz_metrics.keys()),
-        'Value': list(viz_metrics.values())
-    })
-    
-    # Create bar chart
-    fig = px.bar(
-        df, 
-        x='Metric', 
-        y='Value', 
-        color='Metric',
-        title='Video Metadata',
-        color_discrete_sequence=px.colors.qualitative.Pastel,
-        text='Value'
-    )
-    
-    fig.update_layout(
-        xaxis_title=None,
-        yaxis_title='Value',
-        showlegend=False,
-        height=400
-    )
+    # Split off very large numbers that might skew the visualization; they
+    # are displayed separately below
+    viz_metrics, large_metrics = {}, {}
+    for k, v in metrics.items():
+        (viz_metrics if v < 10000 else large_metrics)[k] = v
     
     # Display the chart
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(_build_metadata_figure(viz_metrics), use_container_width=True)
     
     # For very large numbers like frame count, display them separately
-    large_metrics = {k: v for k, v in metrics.items() if v >= 10000}
     if large_metrics:
-        st.markdown("**Additional Metrics:**")
-        for metric, value in large_metrics.items():
-            st.markdown(f"- **{metric}**: {value:,}")
+        # One markdown element rather than one per metric
+        st.markdown("**Additional Metrics:**\n\n" + "\n".join(
+            f"- **{metric}**: {value:,}" for metric, value in large_metrics.items()
+        ))
+
+def _build_altered_frames_figure(frames, total_frames):
+    """
+    Build the altered-frame distribution chart
+    
+    Args:
+        frames (numpy.ndarray): Non-empty int64 array of altered frame indices
+        total_frames (int): Total number of frames in the video
+        
+    Returns:
+        go.Figure: Line graph of altered frames per bin
+    """
+    # Create histogram data
+    bin_count = min(50, len(frames))  # Adjust bin count based on data
+    hist, bin_edges = _bin_altered(frames, total_frames, bin_count)
+    
+    # Create line graph from plain dicts, skipping Plotly's validation
+    layout = dict(_LINE_LAYOUT, shapes=[], annotations=[])
+    
+    # Add a vertical line at major clusters of altered frames
+    if len(frames) > 0:
+        # A cluster starts at the first frame and after every gap of more than 5 frames
+        cluster_starts = np.empty(frames.shape, dtype=bool)
+        cluster_starts[0] = True
+        np.greater(np.diff(frames), 5, out=cluster_starts[1:])
+        major_clusters = frames[cluster_starts][:5].tolist()  # Limit to first 5 major clusters
+        
+        # Equivalent of fig.add_vline(..., annotation_position="top right")
+        for cluster in major_clusters:
+            layout['shapes'].append({
+                'type': 'line',
+                'x0': cluster, 'x1': cluster, 'xref': 'x',
+                'y0': 0, 'y1': 1, 'yref': 'y domain',
+                'line': {'dash': 'dash', 'color': 'red'},
+            })
+            layout['annotations'].append({
+                'text': f"Frame {cluster}",
+                'x': cluster, 'xref': 'x', 'xanchor': 'left',
+                'y': 1, 'yref': 'y domain', 'yanchor': 'top',
+                'showarrow': False,
+            })
+    
+    # x and y stay ndarrays so Plotly serializes them as base64 typed arrays
+    fig = go.Figure({
+        'data': [{
+            'type': 'scatter',
+            'mode': 'lines+markers',
+            'x': bin_edges[:-1],
+            'y': hist,
+        }],
+        'layout': layout,
+    }, _validate=False)
+    
+    return fig
 
 def plot_altered_frames(altered_frames, total_frames):
     """
     Create a line graph showing the distribution of altered frames
     
     Args:
-        altered_frames (list): List of altered frame indices
+        altered_frames (array-like): Altered frame indices
         total_frames (int): Total number of frames in the video
     """
-    if not altered_frames:
+    if len(altered_frames) == 0:
         st.info("No altered frames detected to visualize.")
         return
     
-    # Create histogram data
-    bin_count = min(50, len(altered_frames))  # Adjust bin count based on data
-    hist, bin_edges = np.histogram(altered_frames, bins=bin_count)
-    
-    # Create dataframe for plotting
-    df = pd.DataFrame({
-        'Frame Range': [f"{int(bin_edges[i])}-{int(bin_edges[i+1])}" for i in range(len(bin_edges)-1)],
-        'Altered Frame Count': hist,
-        'Start Frame': bin_edges[:-1]
-    })
-    
-    # Create line graph
-    fig = px.line(
-        df, 
-        x='Start Frame', 
-        y='Altered Frame Count',
-        title='Distribution of Altered Frames',
-        markers=True
-    )
-    
-    fig.update_layout(
-        xaxis_title='Frame Position',
-        yaxis_title='Number of Altered Frames',
-        height=400
-    )
+    frames = _as_frame_array(altered_frames)
     
-    # Add a vertical line at major clusters of altered frames
-    if len(altered_frames) > 0:
-        major_clusters = [frame for i, frame in enumerate(altered_frames) 
-                         if i == 0 or frame - altered_frames[i-1] > 5]
-        
-        for cluster in major_clusters[:5]:  # Limit to first 5 major clusters
-            fig.add_vline(
-                x=cluster, 
-                line_dash="dash", 
-                line_color="red",
-                annotation_text=f"Frame {cluster}",
-                annotation_position="top right"
-            )
+    # The frame set only changes on upload, so an identity check plus an O(1)
+    # fingerprint skips rebuilding the figure on reruns. The memo is kept per
+    # session as one (frames, key, figure) tuple
+    key = (len(frames), int(frames[0]), int(frames[-1]), total_frames)
+    last_frames, last_key, fig = st.session_state.get('altered_frames_chart', (None, None, None))
+    if frames is not last_frames or key != last_key:
+        fig = _build_altered_frames_figure(frames, total_frames)
+        st.session_state.altered_frames_chart = (frames, key, fig)
     
     st.plotly_chart(fig, use_container_width=True)
 
-def create_frame_heatmap(altered_frames, total_frames):
+def _build_heatmap_figure(frames, total_frames):
     """
-    Create a heatmap visualization showing where alterations occur in the video timeline
+    Build the timeline alteration heatmap
     
     Args:
-        altered_frames (list): List of altered frame indices
+        frames (numpy.ndarray): Non-empty int64 array of altered frame indices
         total_frames (int): Total number of frames in the video
+        
+    Returns:
+        go.Figure: One-row heatmap of alteration intensity per segment
     """
-    if not altered_frames:
-        return
-    
     # Create a timeline representation
     segments = 100  # Divide the video into 100 segments
-    segment_size = max(1, total_frames // segments)
     
     # Count altered frames in each segment
-    segment_counts = [0] * segments
-    for frame in altered_frames:
-        segment_idx = min(segments - 1, frame // segment_size)
-        segment_counts[segment_idx] += 1
+    segment_counts, _ = _bin_altered(frames, total_frames, segments)
     
     # Normalize the counts for better visualization
-    max_count = max(segment_counts) if segment_counts else 1
-    normalized_counts = [count / max_count for count in segment_counts]
-    
-    # Create a dataframe for the heatmap
-    df = pd.DataFrame({
-        'Segment': list(range(segments)),
-        'Alteration Intensity': normalized_counts
-    })
-    
-    # Reshape for heatmap (1-row matrix)
-    matrix = np.array(normalized_counts).reshape(1, -1)
-    
-    # Create heatmap
-    fig = go.Figure(data=go.Heatmap(
-        z=matrix,
-        colorscale='Reds',
-        showscale=True,
-        text=[[f"{int(c * 100)}%" if c > 0 else "" for c in normalized_counts]],
-        texttemplate="%{text}",
-        textfont={"size":10},
-    ))
-    
-    fig.update_layout(
-        title='Video Timeline Alteration Heatmap',
-        xaxis_title='Video Timeline (0% to 100%)',
-        yaxis_showticklabels=False,
-        height=200,
-        margin=dict(l=10, r=10, t=30, b=30)
-    )
+    normalized_counts = segment_counts / max(segment_counts.max(), 1)
     
-    st.plotly_chart(fig, use_container_width=True)
+    # Quantize to whole percentages; a display colorscale needs nothing finer,
+    # and one byte per cell keeps the serialized figure small
+    percentages = (normalized_counts * 100).astype(np.uint8)
+    
+    # Reshape for heatmap (1-row matrix); as an ndarray it is serialized as a
+    # base64 typed array rather than a JSON list
+    matrix = percentages[np.newaxis, :]
+    
+    trace = {
+        'type': 'heatmap',
+        'z': matrix,
+        'zmin': 0,
+        'zmax': 100,
+        'colorscale': 'Reds',
+        'showscale': True,
+    }
+    
+    # Percentage labels, blank for segments without alterations; skipped
+    # entirely for sparse timelines where almost every cell would be empty
+    if np.count_nonzero(percentages) > _HEATMAP_MIN_LABELED_SEGMENTS:
+        labels = np.where(normalized_counts > 0, np.char.add(percentages.astype(str), "%"), "")
+        trace.update({
+            'text': [labels.tolist()],
+            'texttemplate': "%{text}",
+            'textfont': {"size": 10},
+        })
+    
+    # Create heatmap from plain dicts, skipping Plotly's validation
+    fig = go.Figure({'data': [trace], 'layout': _HEATMAP_LAYOUT}, _validate=False)
+    
+    return fig
+
+def create_frame_heatmap(altered_frames, total_frames):
+    """
+    Create a heatmap visualization showing where alterations occur in the video timeline
+    
+    Args:
+        altered_frames (array-like): Altered frame indices
+        total_frames (int): Total number of frames in the video
+    """
+    if len(altered_frames) == 0:
+        return
+    
+    frames = _as_frame_array(altered_frames)
+    st.plotly_chart(_build_heatmap_figure(frames, total_frames), use_container_width=True)
     
     # Add explanation
     st.caption("The heatmap shows the distribution of alterations across the video timeline. " +